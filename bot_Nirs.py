@@ -1,10 +1,20 @@
 import os
-import json
+import asyncio
+import calendar
+import functools
+import hashlib
 import logging
-import requests
+import re
+import sqlite3
+import threading
+import uuid
+import httpx
+import orjson
 from datetime import datetime
+from cachetools import TTLCache
 from dotenv import load_dotenv
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.helpers import escape_markdown
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
 from telegram.request import HTTPXRequest
 
@@ -13,6 +23,9 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s',
     level=logging.INFO
 )
+# httpx logs every request at INFO with its full URL: search text for Supabase
+# and the bot token for Telegram. Keep only its warnings.
+logging.getLogger('httpx').setLevel(logging.WARNING)
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +39,9 @@ TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
 if not TELEGRAM_BOT_TOKEN:
     raise ValueError("No TELEGRAM_BOT_TOKEN found in environment variables")
 
+# Telegram user ids allowed to run admin commands, comma separated
+ADMIN_IDS = {int(user_id) for user_id in os.getenv('TELEGRAM_ADMIN_IDS', '').split(',') if user_id.strip()}
+
 # Supabase REST API headers
 headers = {
     'apikey': SUPABASE_KEY,
@@ -34,6 +50,72 @@ headers = {
     'Prefer': 'return=representation'
 }
 
+# Columns needed to render an advisor card and an advisor schedule
+ADVISOR_INFO_COLUMNS = (
+    'id,last_name,research_field,email,phone,'
+    'bachelors_limit,masters_limit,phd_limit,office_hours,updated_at'
+)
+ADVISOR_SCHEDULE_COLUMNS = 'id,last_name,office_hours,calendar,updated_at'
+
+# Advisors shown per page in the bot and the default row limit of fetch_advisors
+ADVISORS_PAGE_SIZE = 10
+ADVISORS_FETCH_LIMIT = 50
+# Advisors are listed by last name; id breaks ties so that pages are stable
+ADVISORS_ORDER = 'last_name.asc,id.asc'
+
+# In-memory cache for Supabase responses, keyed by search query and columns
+ADVISOR_CACHE_TTL = 30  # seconds
+_ADVISOR_CACHE = TTLCache(maxsize=128, ttl=ADVISOR_CACHE_TTL)
+_ADVISOR_REQUESTS = {}
+# Cache key of the sorted unique research fields built by get_unique_research_fields
+UNIQUE_FIELDS_KEY = ('__unique_research_fields__',)
+
+# Shared Supabase client: keeps HTTP/2 connections alive between handler calls.
+# httpx advertises and decodes gzip, and br when the brotli extra is installed.
+_HTTP = httpx.AsyncClient(
+    base_url=f"{SUPABASE_URL}/rest/v1",
+    # httpx rejects None header values, so skip apikey when SUPABASE_KEY is not set
+    headers={k: v for k, v in headers.items() if v is not None},
+    http2=True,
+    timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+)
+
+# Advisor cards of a page are sent as one message, split only when it gets too long.
+# Telegram allows 4096 characters; the margin covers characters counted twice in UTF-16.
+MESSAGE_LENGTH_LIMIT = 4000
+ADVISOR_CARD_SEPARATOR = "\n———\n\n"
+
+# Snapshot of the whole advisors table, rebuilt by refresh_advisors
+ADVISOR_REFRESH_INTERVAL = 120  # seconds
+ADVISOR_SYNC_BATCH = 1000  # rows per request
+_ADVISOR_BY_ID = {}
+_ADVISOR_BY_FIELD = {}
+
+# Rendered advisor cards and schedules, keyed by advisor id and updated_at.
+# updated_at is not bumped on every edit, so entries are also dropped on each
+# snapshot refresh and expire after one refresh interval.
+# Schedules are rendered in worker threads, so cache access is locked
+_ADVISOR_RENDER_CACHE = TTLCache(maxsize=512, ttl=ADVISOR_REFRESH_INTERVAL)
+_ADVISOR_RENDER_LOCK = threading.Lock()
+
+# Local SQLite copy of the snapshot: survives restarts and serves full-text search.
+# The trigram tokenizer only matches queries of at least three characters.
+ADVISOR_DB_PATH = os.getenv('ADVISOR_CACHE_DB', 'advisors_cache.sqlite3')
+ADVISOR_DB_MIN_QUERY = 3
+# One connection shared by worker threads, opened on first use
+_ADVISOR_DB = None
+_ADVISOR_DB_LOCK = threading.Lock()
+# Whether the SQLite table holds the current snapshot; searches scan memory otherwise
+_ADVISOR_DB_IN_SYNC = False
+
+# Research field names by the id used in callback_data, filled from the field list
+_FIELD_BY_ID = {}
+
+# callback_data of pages: f_<field id>[_p<offset>] and q_p<offset>
+FIELD_CALLBACK_PATTERN = re.compile(r'f_([0-9a-f]+)(?:_p(\d+))?')
+SEARCH_PAGE_CALLBACK_PATTERN = re.compile(r'q_p(\d+)')
+
 # Dictionary for translating days of the week
 WEEKDAYS = {
     'monday': 'Понедельник',
@@ -45,7 +127,14 @@ WEEKDAYS = {
     'sunday': 'Воскресенье'
 }
 
-# Dictionary for weekday numbers (0 = Monday, 6 = Sunday)
+# Weekday translations accepting the lowercase, Capitalized and UPPERCASE spellings
+WEEKDAYS_ANY = {
+    **WEEKDAYS,
+    **{day.capitalize(): name for day, name in WEEKDAYS.items()},
+    **{day.upper(): name for day, name in WEEKDAYS.items()},
+}
+
+# Weekday names by number (0 = Monday, 6 = Sunday), used to build WEEKDAY_BITS
 WEEKDAY_NUMBERS = {
     0: 'Понедельник',
     1: 'Вторник',
@@ -56,94 +145,366 @@ WEEKDAY_NUMBERS = {
     6: 'Воскресенье'
 }
 
-# Reverse mapping for weekdays (Russian to English)
-WEEKDAYS_REVERSE = {v: k for k, v in WEEKDAYS.items()}
+# Bit of each weekday in a consultation mask (Monday = bit 0)
+WEEKDAY_BITS = {name: 1 << number for number, name in WEEKDAY_NUMBERS.items()}
+
+# Month names in Russian indexed by month number: genitive for dates, nominative for headers
+MONTHS_GENITIVE = (
+    '',
+    'января', 'февраля', 'марта', 'апреля',
+    'мая', 'июня', 'июля', 'августа',
+    'сентября', 'октября', 'ноября', 'декабря'
+)
+
+MONTHS_NOMINATIVE = (
+    '',
+    'Январь', 'Февраль', 'Март', 'Апрель',
+    'Май', 'Июнь', 'Июль', 'Август',
+    'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь'
+)
+
+# Static menus are immutable, so they are built once at import time
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("📚 Список направлений исследований", callback_data='list_advisors')],
+    [InlineKeyboardButton("🔍 Поиск по фамилии или направлению", callback_data='search_field')],
+    [InlineKeyboardButton("ℹ️ Помощь", callback_data='help')]
+])
+
+BACK_TO_MAIN_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔙 Назад в главное меню", callback_data='back_to_main')]
+])
+
+# Back button under a schedule, returning to the advisor's info
+SCHEDULE_BACK_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔙 Назад к информации", callback_data='list_advisors')]
+])
+
+
+async def fetch_advisors(search_query=None, columns='*', limit=ADVISORS_FETCH_LIMIT, offset=0):
+    """Fetch advisors from Supabase using REST API.
+
+    Only the requested columns and at most limit rows starting at offset
+    are returned. Results are cached for ADVISOR_CACHE_TTL seconds per
+    search query, column set and page.
+    """
+    # Paginated results need a total order, otherwise pages may overlap or skip rows
+    params = {'select': columns, 'order': ADVISORS_ORDER}
+
+    # Add search query if provided - search by both last_name and research_field
+    if search_query:
+        search_query = normalize_search_query(search_query)
+        pattern = quote_ilike_pattern(search_query)
+        params['or'] = f"(last_name.ilike.{pattern},research_field.ilike.{pattern})"
+
+    key = (search_query or '__all__', columns, limit, offset)
+    return await _fetch_cached(key, params, page_range=(offset, offset + limit - 1))
+
+
+async def fetch_advisors_by_field(field, columns='*', limit=ADVISORS_FETCH_LIMIT, offset=0):
+    """Fetch a page of advisors whose research field is exactly field.
+
+    Rows come in the same order as in the refreshed snapshot and are
+    cached like in fetch_advisors.
+    """
+    params = {'select': columns, 'order': ADVISORS_ORDER, 'research_field': f'eq.{field}'}
+    key = ('__field__', field, columns, limit, offset)
+    return await _fetch_cached(key, params, page_range=(offset, offset + limit - 1))
+
+
+def normalize_search_query(search_query):
+    """Lowercase a search query and drop '*', which PostgREST treats as a wildcard."""
+    return search_query.replace('*', ' ').strip().lower()
+
 
+def quote_ilike_pattern(search_query):
+    """Build a quoted PostgREST ilike pattern matching search_query anywhere in a value.
 
-def fetch_advisors(search_query=None):
-    """Fetch advisors from Supabase using REST API."""
+    LIKE wildcards in the query are escaped so they match literally, and the
+    pattern is double-quoted so that ',', '(' and ')' don't end the or=() filter.
+    """
+    pattern = re.sub(r'([\\%_])', r'\\\1', search_query)
+    pattern = pattern.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"*{pattern}*"'
+
+
+async def fetch_advisor_by_id(advisor_id, columns='*'):
+    """Fetch a single advisor by primary key.
+
+    Returns the advisor dict, an empty dict if there is no such advisor
+    or None if the request failed.
+    """
+    # Ids are uuids; anything else would only make Postgres fail the cast
+    try:
+        uuid.UUID(advisor_id)
+    except ValueError:
+        return {}
+
+    params = {'select': columns, 'id': f'eq.{advisor_id}', 'limit': 1}
+    advisors = await _fetch_cached(('__id__', advisor_id, columns), params)
+    if advisors is None:
+        return None
+    return advisors[0] if advisors else {}
+
+
+async def _fetch_cached(key, params, page_range=None):
+    """Run a Supabase query through the TTL cache."""
+    advisors = _ADVISOR_CACHE.get(key)
+    if advisors is not None:
+        return advisors
+
+    # Concurrent misses share one in-flight request so a cold cache doesn't stampede Supabase
+    request = _ADVISOR_REQUESTS.get(key)
+    if request is not None:
+        return await asyncio.shield(request)
+
+    request = asyncio.ensure_future(_request_advisors(params, page_range))
+    _ADVISOR_REQUESTS[key] = request
     try:
-        url = f"{SUPABASE_URL}/rest/v1/scientific_advisors"
+        advisors = await asyncio.shield(request)
+    finally:
+        _ADVISOR_REQUESTS.pop(key, None)
 
-        # Add search query if provided - search by both last_name and research_field
-        if search_query:
-            url += f"?or=(last_name.ilike.*{search_query}*,research_field.ilike.*{search_query}*)"
+    if advisors is not None:
+        _ADVISOR_CACHE[key] = advisors
+    return advisors
 
-        logger.info(f"Fetching advisors from URL: {url}")
-        logger.info(f"Using SUPABASE_URL: {SUPABASE_URL}")
-        logger.info(f"Using SUPABASE_KEY: {'set' if SUPABASE_KEY else 'not set'}")
-        logger.info(f"Using headers: {headers}")
 
-        response = requests.get(url, headers=headers, timeout=10)
+async def _request_advisors(params, page_range=None):
+    """Request advisors from Supabase bypassing the cache.
+
+    page_range is an inclusive (first, last) row range sent as a PostgREST
+    Range header; without it all matching rows are returned.
+    """
+    result = await _request_advisors_counted(params, page_range, count=False)
+    return None if result is None else result[0]
+
+
+async def _request_advisors_counted(params, page_range=None, count=True):
+    """Request advisors like _request_advisors, along with the number of matching rows.
+
+    Returns (advisors, total) or None on error. total comes from the
+    Content-Range header and is None unless count is set and the server
+    reported it.
+    """
+    try:
+        request_headers = {}
+        if page_range:
+            request_headers.update({'Range-Unit': 'items', 'Range': f'{page_range[0]}-{page_range[1]}'})
+        if count:
+            request_headers['Prefer'] = 'count=exact'
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fetching advisors params=%s range=%s", params, page_range)
+
+        response = await _HTTP.get("/scientific_advisors", params=params, headers=request_headers)
         response.raise_for_status()
 
-        advisors = response.json()
-        logger.info(f"Received {len(advisors)} advisors from database")
-        return advisors
-    except requests.exceptions.Timeout:
+        advisors = orjson.loads(response.content)
+        logger.debug("Received %d advisors from database", len(advisors))
+        # Content-Range is '<first>-<last>/<total>', or '.../*' when not counted
+        total = response.headers.get('Content-Range', '').rpartition('/')[2]
+        return advisors, int(total) if total.isdigit() else None
+    except httpx.TimeoutException:
         logger.error("Timeout while fetching advisors from Supabase")
         return None
+    except httpx.HTTPStatusError as e:
+        logger.error("Supabase returned %s for advisors: %s", e.response.status_code, e.response.text)
+        return None
     except Exception as e:
         logger.error(f"Error fetching advisors: {str(e)}", exc_info=True)
         return None
 
 
-def get_unique_research_fields():
-    """Get list of unique research fields from advisors."""
+async def fetch_research_fields():
+    """Fetch research fields from Supabase.
+
+    Returns one entry per advisor (duplicates included) or None on error.
+    """
+    params = {'select': 'research_field'}
+    rows = await _fetch_cached(('__research_fields__',), params)
+    if rows is None:
+        return None
+    return [row['research_field'] for row in rows]
+
+
+def get_field_id(field):
+    """Get a short stable id of a research field for use in callback_data."""
+    return hashlib.blake2b(field.encode(), digest_size=4).hexdigest()
+
+
+async def get_unique_research_fields():
+    """Get the sorted unique research fields of advisors as a tuple.
+
+    The result is kept in the advisors cache for ADVISOR_CACHE_TTL seconds
+    and dropped whenever the snapshot is refreshed.
+    """
+    fields = _ADVISOR_CACHE.get(UNIQUE_FIELDS_KEY)
+    if fields is not None:
+        return fields
+
     try:
-        advisors = fetch_advisors()
-        if advisors:
-            fields = set(advisor['research_field'] for advisor in advisors)
-            return sorted(list(fields))
-        return []
+        if _ADVISOR_BY_FIELD:
+            fields = tuple(sorted(_ADVISOR_BY_FIELD))
+        else:
+            # Sorted here rather than by the database so both paths use the same order
+            fields = await fetch_research_fields()
+            fields = tuple(sorted(set(fields))) if fields else ()
     except Exception as e:
         logger.error(f"Error getting research fields: {str(e)}", exc_info=True)
+        return ()
+
+    if fields:
+        for field in fields:
+            _FIELD_BY_ID[get_field_id(field)] = field
+        _ADVISOR_CACHE[UNIQUE_FIELDS_KEY] = fields
+    return fields
+
+
+async def get_advisors_by_field(field, offset=0):
+    """Get a page of advisors of a research field, preferring the refreshed snapshot.
+
+    Up to ADVISORS_PAGE_SIZE + 1 advisors are returned; the extra one only
+    tells that there is a next page.
+    """
+    limit = ADVISORS_PAGE_SIZE + 1
+    advisors = _ADVISOR_BY_FIELD.get(field)
+    if advisors is not None:
+        return advisors[offset:offset + limit]
+    return await fetch_advisors_by_field(field, columns=ADVISOR_INFO_COLUMNS, limit=limit, offset=offset)
+
+
+async def get_advisor_by_id(advisor_id):
+    """Get a single advisor, preferring the refreshed snapshot.
+
+    Returns the same values as fetch_advisor_by_id.
+    """
+    advisor = _ADVISOR_BY_ID.get(advisor_id)
+    if advisor is not None:
+        return advisor
+    return await fetch_advisor_by_id(advisor_id, columns=ADVISOR_SCHEDULE_COLUMNS)
+
+
+async def search_advisors(search_query, offset=0):
+    """Search a page of advisors by last name or research field, preferring the refreshed snapshot.
+
+    Pages are sized like in get_advisors_by_field.
+    """
+    search_query = normalize_search_query(search_query)
+    if not search_query:
         return []
 
+    limit = ADVISORS_PAGE_SIZE + 1
+    if not _ADVISOR_BY_ID:
+        return await fetch_advisors(search_query, columns=ADVISOR_INFO_COLUMNS, limit=limit, offset=offset)
+
+    if _ADVISOR_DB_IN_SYNC and len(search_query) >= ADVISOR_DB_MIN_QUERY:
+        try:
+            return await asyncio.to_thread(search_advisors_db, search_query, limit, offset)
+        except sqlite3.Error as e:
+            logger.warning(f"Local advisors search failed, scanning the snapshot: {e}")
+
+    # Same case-insensitive substring match as the ilike filter in fetch_advisors
+    needle = search_query.casefold()
+    advisors = [
+        advisor for advisor in _ADVISOR_BY_ID.values()
+        if needle in advisor['last_name'].casefold() or needle in advisor['research_field'].casefold()
+    ]
+    return advisors[offset:offset + limit]
+
+
+def _advisor_db():
+    """Get the local SQLite cache connection, creating the table on first use.
+
+    Callers must hold _ADVISOR_DB_LOCK.
+    """
+    global _ADVISOR_DB
+    if _ADVISOR_DB is None:
+        db = sqlite3.connect(ADVISOR_DB_PATH, check_same_thread=False)
+        db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS advisors_fts USING fts5("
+            "id UNINDEXED, last_name, research_field, data UNINDEXED, tokenize='trigram')"
+        )
+        _ADVISOR_DB = db
+    return _ADVISOR_DB
+
+
+def save_advisors_db(advisors):
+    """Replace the advisors in the local SQLite cache, keeping their display order as rowid."""
+    with _ADVISOR_DB_LOCK:
+        db = _advisor_db()
+        with db:
+            db.execute("DELETE FROM advisors_fts")
+            db.executemany(
+                "INSERT INTO advisors_fts (rowid, id, last_name, research_field, data) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (position, advisor['id'], advisor['last_name'], advisor['research_field'],
+                     orjson.dumps(advisor))
+                    for position, advisor in enumerate(advisors)
+                )
+            )
+
+
+def load_advisors_db():
+    """Load the advisors saved in the local SQLite cache in display order."""
+    with _ADVISOR_DB_LOCK:
+        rows = _advisor_db().execute("SELECT data FROM advisors_fts ORDER BY rowid").fetchall()
+    return [orjson.loads(data) for (data,) in rows]
+
+
+def search_advisors_db(search_query, limit, offset):
+    """Get a page of saved advisors whose last name or research field contains search_query.
+
+    Only call it after the table has been created by save_advisors_db or load_advisors_db.
+    """
+    phrase = search_query.replace('"', '""')
+    with _ADVISOR_DB_LOCK:
+        rows = _ADVISOR_DB.execute(
+            "SELECT data FROM advisors_fts WHERE advisors_fts MATCH ? ORDER BY rowid LIMIT ? OFFSET ?",
+            (f'{{last_name research_field}}: "{phrase}"', limit, offset)
+        ).fetchall()
+    return [orjson.loads(data) for (data,) in rows]
 
-def format_date(date_str):
-    """Convert date string from '2025-04-01' to '1 апреля 2025'"""
-    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-    months = {
-        1: 'января', 2: 'февраля', 3: 'марта', 4: 'апреля',
-        5: 'мая', 6: 'июня', 7: 'июля', 8: 'августа',
-        9: 'сентября', 10: 'октября', 11: 'ноября', 12: 'декабря'
-    }
-    return f"{date_obj.day} {months[date_obj.month]} {date_obj.year}"
 
+@functools.lru_cache(maxsize=256)
+def get_consultation_days(office_days):
+    """Get set of weekdays when advisor has consultations.
+
+    office_days is a frozenset of the advisor's office_hours keys, which
+    keeps the result cacheable.
+    """
+    return frozenset(WEEKDAYS_ANY.get(day, day) for day in office_days)
 
-def get_weekday(date_str):
-    """Get weekday name for a given date."""
-    date_obj = datetime.strptime(date_str, '%Y-%m-%d')
-    return WEEKDAY_NUMBERS[date_obj.weekday()]
 
+@functools.lru_cache(maxsize=256)
+def get_consultation_mask(consultation_days):
+    """Encode consultation weekdays as a 7-bit mask (bit 0 = Monday)."""
+    mask = 0
+    for day in consultation_days:
+        mask |= WEEKDAY_BITS.get(day, 0)
+    return mask
 
-def get_consultation_days(office_hours):
-    """Get list of weekdays when advisor has consultations."""
-    consultation_days = []
-    for day, _ in office_hours.items():
-        day_ru = WEEKDAYS.get(day.lower(), day)
-        consultation_days.append(day_ru)
-    return consultation_days
 
+def is_consultation_day(day, first_weekday, mask):
+    """Check a day of month against a consultation mask without parsing dates."""
+    return (mask >> ((first_weekday + day - 1) % 7)) & 1
 
-def filter_available_days(days, year, month, consultation_days):
-    """Filter available days to only include advisor's consultation days."""
-    filtered_days = []
-    for day in days:
-        date_str = f"{year}-{month:02d}-{day:02d}"
-        weekday = get_weekday(date_str)
-        if weekday in consultation_days:
-            filtered_days.append(day)
-    return filtered_days
 
+def filter_available_days(days, first_weekday, days_in_month, mask):
+    """Filter available days to only include advisor's consultation days.
+
+    Days outside the month are dropped as well.
+    """
+    return [
+        day for day in days
+        if 1 <= day <= days_in_month and is_consultation_day(day, first_weekday, mask)
+    ]
 
-def format_calendar(calendar_data, advisor):
+
+def format_calendar(calendar_data, office_hours, current_month):
     """Format calendar data for display."""
     if not calendar_data:
         return "Календарь не доступен"
 
-    current_month = datetime.now().strftime("%Y-%m")
     month_data = calendar_data.get(current_month, {})
 
     if not month_data:
@@ -153,112 +514,196 @@ def format_calendar(calendar_data, advisor):
     year, month = map(int, current_month.split('-'))
 
     # Get advisor's consultation days
-    consultation_days = get_consultation_days(advisor['office_hours'])
+    consultation_days = get_consultation_days(frozenset(office_hours))
+    mask = get_consultation_mask(consultation_days)
+
+    # Weekday of the 1st and month length, shared by all day checks below
+    first_weekday, days_in_month = calendar.monthrange(year, month)
 
     available_days = month_data.get('available_days', [])
     # Filter available days to only include advisor's consultation days
-    filtered_days = filter_available_days(available_days, year, month, consultation_days)
+    filtered_days = filter_available_days(available_days, first_weekday, days_in_month, mask)
 
     busy_slots = month_data.get('busy_slots', {})
 
-    # Get month name in Russian
-    months = {
-        1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
-        5: 'Май', 6: 'Июнь', 7: 'Июль', 8: 'Август',
-        9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
-    }
-    month_name = months[month]
+    # Get month name in Russian, and the month part of busy dates ('апреля 2025')
+    month_name = MONTHS_NOMINATIVE[month]
+    date_suffix = f"{MONTHS_GENITIVE[month]} {year}"
 
-    result = f"📅 Расписание на {month_name} {year}:\n\n"
-    result += "Доступные дни: " + ", ".join(str(day) for day in sorted(filtered_days)) + "\n\n"
-    result += "Занятые слоты:\n"
+    # Days and dates come sorted from the database (see the sort_advisor_calendar trigger).
+    # Busy dates belong to current_month, so only the day is needed to filter and format them.
+    busy_lines = "".join(
+        f"{day} {date_suffix}: {escape_md(', '.join(slots))}\n"
+        for date_str, slots in busy_slots.items()
+        if is_consultation_day(day := int(date_str[-2:]), first_weekday, mask)
+    )
+    available = ", ".join(str(day) for day in filtered_days)
+
+    return (
+        f"📅 Расписание на {month_name} {year}:\n\n"
+        f"Доступные дни: {available}\n\n"
+        "Занятые слоты:\n"
+        f"{busy_lines}"
+    )
 
-    # Filter and sort busy slots
-    filtered_busy_slots = {}
-    for date, slots in busy_slots.items():
-        weekday = get_weekday(date)
-        if weekday in consultation_days:
-            filtered_busy_slots[date] = slots
 
-    # Sort dates and format them
-    for date in sorted(filtered_busy_slots.keys()):
-        slots = filtered_busy_slots[date]
-        formatted_date = format_date(date)
-        result += f"{formatted_date}: {', '.join(slots)}\n"
+@functools.lru_cache(maxsize=1024)
+def escape_md(value):
+    """Escape a value from the database for MarkdownV2 messages."""
+    return escape_markdown(str(value), version=2)
 
-    return result
+
+@functools.lru_cache(maxsize=1024)
+def format_office_hours(office_hours_items):
+    """Format office hours given as (day, hours) pairs, with day names translated to Russian."""
+    return "".join(
+        f"   \\- {escape_md(WEEKDAYS_ANY.get(day, day))}: {escape_md(hours)}\n"
+        for day, hours in office_hours_items
+    )
+
+
+def render_cached(kind, advisor, render, *stamp):
+    """Return render(advisor), reusing the text rendered for the same advisor version.
+
+    The version is the row's updated_at; rows without it are rendered every time.
+    """
+    version = advisor.get('updated_at')
+    if version is None:
+        return render(advisor)
+    key = (kind, advisor['id'], version, *stamp)
+    with _ADVISOR_RENDER_LOCK:
+        text = _ADVISOR_RENDER_CACHE.get(key)
+    if text is None:
+        text = render(advisor)
+        with _ADVISOR_RENDER_LOCK:
+            _ADVISOR_RENDER_CACHE[key] = text
+    return text
 
 
 def format_advisor_basic_info(advisor):
-    """Format basic advisor information into a message."""
-    message = f"👤 *{advisor['last_name']}*\n"
-    message += f"📚 Направление: {advisor['research_field']}\n"
-    message += f"📧 Email: {advisor['email']}\n"
-    message += f"📞 Телефон: {advisor['phone']}\n"
-    message += f"👥 Лимиты студентов:\n"
-    message += f"   - Бакалавриат: {advisor['bachelors_limit']}\n"
-    message += f"   - Магистратура: {advisor['masters_limit']}\n"
-    message += f"   - Аспирантура: {advisor['phd_limit']}\n"
-    message += "🕒 Часы консультаций:\n"
-    for day, hours in advisor['office_hours'].items():
-        # Translate day name to Russian
-        day_ru = WEEKDAYS.get(day.lower(), day)
-        message += f"   - {day_ru}: {hours}\n"
-    return message
+    """Format basic advisor information into a MarkdownV2 message."""
+    return render_cached('info', advisor, _render_advisor_basic_info)
+
+
+def _render_advisor_basic_info(advisor):
+    office_hours = format_office_hours(tuple(advisor['office_hours'].items()))
+    return (
+        f"👤 *{escape_md(advisor['last_name'])}*\n"
+        f"📚 Направление: {escape_md(advisor['research_field'])}\n"
+        f"📧 Email: {escape_md(advisor['email'])}\n"
+        f"📞 Телефон: {escape_md(advisor['phone'])}\n"
+        "👥 Лимиты студентов:\n"
+        f"   \\- Бакалавриат: {escape_md(advisor['bachelors_limit'])}\n"
+        f"   \\- Магистратура: {escape_md(advisor['masters_limit'])}\n"
+        f"   \\- Аспирантура: {escape_md(advisor['phd_limit'])}\n"
+        "🕒 Часы консультаций:\n"
+        f"{office_hours}"
+    )
 
 
 def format_advisor_schedule(advisor):
-    """Format advisor schedule information."""
-    message = f"📅 Расписание научного руководителя *{advisor['last_name']}*:\n\n"
-    message += format_calendar(advisor.get('calendar', {}), advisor)
-    return message
+    """Format advisor schedule information for the current month into a MarkdownV2 message."""
+    current_month = datetime.now().strftime("%Y-%m")
+    return render_cached(
+        'schedule', advisor,
+        lambda advisor: _render_advisor_schedule(advisor, current_month),
+        current_month
+    )
+
+
+def _render_advisor_schedule(advisor, current_month):
+    calendar_text = format_calendar(advisor.get('calendar', {}), advisor['office_hours'], current_month)
+    return f"📅 Расписание научного руководителя *{escape_md(advisor['last_name'])}*:\n\n{calendar_text}"
+
+
+def split_message(parts, separator):
+    """Join message parts into as few texts as possible within Telegram's length limit."""
+    texts = []
+    current = ''
+    for part in parts:
+        candidate = f"{current}{separator}{part}" if current else part
+        if current and len(candidate) > MESSAGE_LENGTH_LIMIT:
+            texts.append(current)
+            candidate = part
+        current = candidate
+    texts.append(current)
+    return texts
+
+
+async def reply_advisor_page(message, header, advisors, callback_prefix, offset, back_text, back_callback):
+    """Reply with a page of advisor cards in as few messages as possible.
+
+    advisors may hold one entry beyond ADVISORS_PAGE_SIZE, which only
+    tells that there is a next page. Schedule, Prev/Next (callback_data
+    '<callback_prefix>_p<offset>') and back buttons go in one keyboard
+    under the last message.
+    """
+    has_next = len(advisors) > ADVISORS_PAGE_SIZE
+    advisors = advisors[:ADVISORS_PAGE_SIZE]
+
+    keyboard = [
+        [InlineKeyboardButton(
+            f"📅 Расписание: {advisor['last_name']}",
+            callback_data=f's_{advisor["id"]}'
+        )]
+        for advisor in advisors
+    ]
+
+    page_row = []
+    if offset > 0:
+        previous_offset = max(offset - ADVISORS_PAGE_SIZE, 0)
+        page_row.append(InlineKeyboardButton("◀️ Назад", callback_data=f'{callback_prefix}_p{previous_offset}'))
+    if has_next:
+        page_row.append(InlineKeyboardButton("Далее ▶️", callback_data=f'{callback_prefix}_p{offset + ADVISORS_PAGE_SIZE}'))
+    if page_row:
+        keyboard.append(page_row)
+
+    keyboard.append([InlineKeyboardButton(back_text, callback_data=back_callback)])
+
+    parts = [escape_md(header)] + [format_advisor_basic_info(advisor) for advisor in advisors]
+    texts = split_message(parts, ADVISOR_CARD_SEPARATOR)
+    for text in texts[:-1]:
+        await message.reply_text(text, parse_mode='MarkdownV2')
+    await message.reply_text(
+        texts[-1],
+        parse_mode='MarkdownV2',
+        reply_markup=InlineKeyboardMarkup(keyboard)
+    )
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Send a message when the command /start is issued."""
     logger.info(f"Start command received from user {update.effective_user.id}")
-    keyboard = [
-        [InlineKeyboardButton("📚 Список направлений исследований", callback_data='list_advisors')],
-        [InlineKeyboardButton("🔍 Поиск по фамилии или направлению", callback_data='search_field')],
-        [InlineKeyboardButton("ℹ️ Помощь", callback_data='help')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
     await update.message.reply_text(
         'Добро пожаловать в бота для поиска научных руководителей!\n'
         'Выберите действие:',
-        reply_markup=reply_markup
+        reply_markup=MAIN_MENU_MARKUP
     )
 
 
 async def list_advisors(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show list of research fields when list_advisors is selected."""
     logger.info("Showing research fields list")
-    fields = get_unique_research_fields()
+    fields = await get_unique_research_fields()
 
     if not fields:
-        await update.callback_query.answer()
         await update.callback_query.message.reply_text(
             "К сожалению, не удалось получить список направлений исследований."
         )
         return
 
     keyboard = []
-    for i, field in enumerate(fields):
-        # Use index as callback_data to keep it short
+    for field in fields:
+        # Use a short stable hash as callback_data; the name is resolved via _FIELD_BY_ID
         keyboard.append([InlineKeyboardButton(
             f"📚 {field}",
-            callback_data=f'f_{i}'
+            callback_data=f'f_{get_field_id(field)}'
         )])
-        # Store the field name in context for later use
-        if 'fields' not in context.user_data:
-            context.user_data['fields'] = {}
-        context.user_data['fields'][str(i)] = field
 
     # Add back button
     keyboard.append([InlineKeyboardButton("🔙 Назад в главное меню", callback_data='back_to_main')])
 
     reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.callback_query.answer()
     await update.callback_query.message.reply_text(
         "Выберите направление исследований:",
         reply_markup=reply_markup
@@ -268,92 +713,69 @@ async def list_advisors(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def show_advisors_by_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show advisors for selected research field."""
     query = update.callback_query
-    field_id = query.data.split('_')[1]  # Get field index from callback_data
+    match = FIELD_CALLBACK_PATTERN.fullmatch(query.data)
+    if match is None:
+        await query.message.reply_text("Произошла ошибка. Пожалуйста, начните сначала.")
+        return
+    field_id, page = match.groups()
+    offset = int(page or 0)
 
-    if 'fields' not in context.user_data or field_id not in context.user_data['fields']:
-        await query.answer()
+    field = _FIELD_BY_ID.get(field_id)
+    if field is None:
+        # The button may predate a restart: rebuild the mapping from the current fields
+        await get_unique_research_fields()
+        field = _FIELD_BY_ID.get(field_id)
+
+    if field is None:
         await query.message.reply_text("Произошла ошибка. Пожалуйста, начните сначала.")
         return
 
-    field = context.user_data['fields'][field_id]
-    advisors = fetch_advisors(field)
+    advisors = await get_advisors_by_field(field, offset)
 
     if advisors is None or not advisors:
-        await query.answer()
         await query.message.reply_text(
             f"Научных руководителей по направлению '{field}' не найдено."
         )
         return
 
-    await query.answer()
-    await query.message.reply_text(
-        f"📋 Список научных руководителей по направлению '{field}':"
+    await reply_advisor_page(
+        query.message,
+        f"📋 Список научных руководителей по направлению '{field}':",
+        advisors, f'f_{field_id}', offset,
+        "🔙 К списку направлений", 'list_advisors'
     )
 
-    for advisor in advisors:
-        keyboard = [
-            [InlineKeyboardButton(
-                "📅 Показать расписание",
-                callback_data=f's_{advisor["id"]}'
-            )],
-            [InlineKeyboardButton(
-                "🔙 К списку направлений",
-                callback_data='list_advisors'
-            )]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        message = format_advisor_basic_info(advisor)
-        await query.message.reply_text(
-            message,
-            parse_mode='Markdown',
-            reply_markup=reply_markup
-        )
-
 
 async def show_schedule(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show schedule for a specific advisor."""
     query = update.callback_query
     advisor_id = query.data.split('_')[1]  # Get advisor ID from callback_data
 
-    advisors = fetch_advisors()
-    if not advisors:
-        await query.answer()
+    advisor = await get_advisor_by_id(advisor_id)
+    if advisor is None:
         await query.message.reply_text("Не удалось получить информацию о расписании.")
         return
 
-    advisor = next((a for a in advisors if a['id'] == advisor_id), None)
     if not advisor:
-        await query.answer()
         await query.message.reply_text("Научный руководитель не найден.")
         return
 
-    await query.answer()
-    message = format_advisor_schedule(advisor)
-
-    # Add back button to return to the advisor's info
-    keyboard = [[InlineKeyboardButton("🔙 Назад к информации", callback_data='list_advisors')]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    # Rendering a calendar is pure Python; keep it off the event loop
+    message = await asyncio.to_thread(format_advisor_schedule, advisor)
 
     await query.message.reply_text(
         message,
-        parse_mode='Markdown',
-        reply_markup=reply_markup
+        parse_mode='MarkdownV2',
+        reply_markup=SCHEDULE_BACK_MARKUP
     )
 
 
 async def search_field(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle advisor search."""
     logger.info(f"Search field request from user {update.effective_user.id}")
-    await update.callback_query.answer()
-
-    # Add back button to the search prompt
-    keyboard = [[InlineKeyboardButton("🔙 Назад в главное меню", callback_data='back_to_main')]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await update.callback_query.message.reply_text(
         "Введите фамилию научного руководителя или направление исследований для поиска:",
-        reply_markup=reply_markup
+        reply_markup=BACK_TO_MAIN_MARKUP
     )
     context.user_data['expecting_search'] = True
 
@@ -366,7 +788,7 @@ async def handle_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
     search_query = update.message.text
     logger.info(f"Processing search query: {search_query}")
 
-    advisors = fetch_advisors(search_query)
+    advisors = await search_advisors(search_query)
 
     if advisors is None:
         await update.message.reply_text(
@@ -375,55 +797,56 @@ async def handle_search(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     if not advisors:
-        # Add back button when no results found
-        keyboard = [[InlineKeyboardButton("🔙 Назад в главное меню", callback_data='back_to_main')]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await update.message.reply_text(
             f"По запросу '{search_query}' ничего не найдено.",
-            reply_markup=reply_markup
+            reply_markup=BACK_TO_MAIN_MARKUP
         )
         return
 
-    await update.message.reply_text(
-        f"🔍 Результаты поиска:"
+    await reply_advisor_page(
+        update.message, "🔍 Результаты поиска:", advisors, 'q', 0,
+        "🔙 Назад в главное меню", 'back_to_main'
     )
 
-    for advisor in advisors:
-        keyboard = [
-            [InlineKeyboardButton(
-                "📅 Показать расписание",
-                callback_data=f's_{advisor["id"]}'
-            )],
-            [InlineKeyboardButton(
-                "🔙 Назад в главное меню",
-                callback_data='back_to_main'
-            )]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
-        message = format_advisor_basic_info(advisor)
-        await update.message.reply_text(
-            message,
-            parse_mode='Markdown',
-            reply_markup=reply_markup
+    # Keep the query for the page buttons, which can't carry it in callback_data
+    context.user_data['search_query'] = search_query
+    context.user_data['expecting_search'] = False
+
+
+async def show_search_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Show another page of the last search results."""
+    query = update.callback_query
+    match = SEARCH_PAGE_CALLBACK_PATTERN.fullmatch(query.data)
+    search_query = context.user_data.get('search_query')
+    if match is None or not search_query:
+        await query.message.reply_text("Произошла ошибка. Пожалуйста, начните сначала.")
+        return
+
+    offset = int(match[1])
+    advisors = await search_advisors(search_query, offset)
+
+    if advisors is None:
+        await query.message.reply_text("Произошла ошибка при поиске научных руководителей.")
+        return
+
+    if not advisors:
+        await query.message.reply_text(
+            f"По запросу '{search_query}' ничего не найдено.",
+            reply_markup=BACK_TO_MAIN_MARKUP
         )
+        return
 
-    context.user_data['expecting_search'] = False
+    await reply_advisor_page(
+        query.message, "🔍 Результаты поиска:", advisors, 'q', offset,
+        "🔙 Назад в главное меню", 'back_to_main'
+    )
 
 
 async def back_to_main(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle returning to the main menu."""
-    keyboard = [
-        [InlineKeyboardButton("📚 Список направлений исследований", callback_data='list_advisors')],
-        [InlineKeyboardButton("🔍 Поиск по фамилии или направлению", callback_data='search_field')],
-        [InlineKeyboardButton("ℹ️ Помощь", callback_data='help')]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    await update.callback_query.answer()
     await update.callback_query.message.reply_text(
         'Главное меню:\nВыберите действие:',
-        reply_markup=reply_markup
+        reply_markup=MAIN_MENU_MARKUP
     )
 
 
@@ -447,46 +870,198 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 Для начала работы используйте команду /start
     """
 
-    # Add back button to help message
-    keyboard = [[InlineKeyboardButton("🔙 Назад в главное меню", callback_data='back_to_main')]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await update.callback_query.answer()
     await update.callback_query.message.reply_text(
         help_text,
         parse_mode='Markdown',
-        reply_markup=reply_markup
+        reply_markup=BACK_TO_MAIN_MARKUP
     )
 
 
+# Callback routes: exact callback_data first, then the two-character prefix.
+# Prefix handlers validate the rest of callback_data themselves.
+CALLBACK_ROUTES = {
+    'list_advisors': list_advisors,
+    'search_field': search_field,
+    'help': help_command,
+    'back_to_main': back_to_main,
+}
+CALLBACK_PREFIX_ROUTES = {
+    's_': show_schedule,
+    'f_': show_advisors_by_field,
+    'q_': show_search_page,
+}
+
+
+async def dispatch_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Route a button press to its handler by callback_data."""
+    query = update.callback_query
+    # Answer first so the button stops spinning while the handler loads its data
+    await query.answer()
+    if not query.data:
+        # Game buttons and inline-mode presses carry no callback_data
+        return
+    handler = CALLBACK_ROUTES.get(query.data) or CALLBACK_PREFIX_ROUTES.get(query.data[:2])
+    if handler is None:
+        logger.warning(f"Unknown callback data: {query.data}")
+        return
+    await handler(update, context)
+
+
+async def clear_cache(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Drop cached advisors data and reload it from Supabase (admins only)."""
+    user_id = update.effective_user.id
+    if user_id not in ADMIN_IDS:
+        logger.warning(f"Cache clear denied for user {user_id}")
+        return
+
+    logger.info(f"Cache clear requested by user {user_id}")
+    _ADVISOR_CACHE.clear()
+    with _ADVISOR_RENDER_LOCK:
+        _ADVISOR_RENDER_CACHE.clear()
+    if await refresh_advisors(context):
+        await update.message.reply_text("Кэш очищен, данные о научных руководителях обновлены.")
+    else:
+        await update.message.reply_text(
+            "Кэш очищен, но обновить данные о научных руководителях не удалось. "
+            "Используются ранее загруженные данные."
+        )
+
+
+async def refresh_advisors(context: ContextTypes.DEFAULT_TYPE):
+    """Reload the advisors snapshot from Supabase (run by the job queue).
+
+    Returns whether the snapshot was reloaded.
+    """
+    advisors = []
+    while True:
+        # Read the table in display order, one bounded range at a time. Batches
+        # may come back shorter than asked (PostgREST max-rows), so page until
+        # the reported total rather than until a short batch.
+        first = len(advisors)
+        result = await _request_advisors_counted(
+            {'select': '*', 'order': ADVISORS_ORDER}, (first, first + ADVISOR_SYNC_BATCH - 1)
+        )
+        if result is None:
+            logger.warning("Advisors refresh failed, keeping the previous snapshot")
+            return False
+        batch, total = result
+        advisors.extend(batch)
+
+        if total is None:
+            # Without a count only the batch size tells where the table ends
+            if len(batch) != ADVISOR_SYNC_BATCH:
+                logger.warning(
+                    f"Supabase sent no row count; assuming the advisors table ends after "
+                    f"{len(advisors)} rows (last batch had {len(batch)} of {ADVISOR_SYNC_BATCH})"
+                )
+                break
+        elif len(advisors) >= total:
+            break
+        elif not batch:
+            # Rows were deleted while paging
+            logger.warning(f"Advisors table shrank during refresh: got {len(advisors)} of {total} rows")
+            break
+
+    set_advisors_snapshot(advisors)
+    logger.info(f"Advisors snapshot refreshed: {len(advisors)} advisors")
+
+    try:
+        await asyncio.to_thread(save_advisors_db, advisors)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not save advisors to the local cache: {e}")
+    else:
+        _mark_advisor_db_in_sync(advisors)
+    return True
+
+
+async def load_saved_advisors(application: Application):
+    """Fill the advisors snapshot from the local SQLite cache before the first refresh."""
+    try:
+        advisors = await asyncio.to_thread(load_advisors_db)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not load advisors from the local cache: {e}")
+        return
+
+    if advisors:
+        set_advisors_snapshot(advisors)
+        _mark_advisor_db_in_sync(advisors)
+        logger.info(f"Advisors snapshot loaded from the local cache: {len(advisors)} advisors")
+
+
+def _mark_advisor_db_in_sync(advisors):
+    """Let searches use the SQLite table if advisors is still the current snapshot."""
+    global _ADVISOR_DB_IN_SYNC
+    # A newer refresh may have replaced the snapshot while the table was being written
+    _ADVISOR_DB_IN_SYNC = len(advisors) == len(_ADVISOR_BY_ID) and all(
+        _ADVISOR_BY_ID.get(advisor['id']) is advisor for advisor in advisors
+    )
+
+
+def set_advisors_snapshot(advisors):
+    """Replace the in-memory advisors snapshot with advisors in display order.
+
+    Searches scan the snapshot until it is also saved to the SQLite table.
+    """
+    global _ADVISOR_DB_IN_SYNC
+    _ADVISOR_DB_IN_SYNC = False
+    by_field = {}
+    for advisor in advisors:
+        by_field.setdefault(advisor['research_field'], []).append(advisor)
+
+    _ADVISOR_BY_ID.clear()
+    _ADVISOR_BY_ID.update((advisor['id'], advisor) for advisor in advisors)
+    _ADVISOR_BY_FIELD.clear()
+    _ADVISOR_BY_FIELD.update(by_field)
+    _ADVISOR_CACHE.pop(UNIQUE_FIELDS_KEY, None)
+    with _ADVISOR_RENDER_LOCK:
+        _ADVISOR_RENDER_CACHE.clear()
+
+
+async def close_http_client(application: Application):
+    """Close the shared Supabase client on shutdown."""
+    await _HTTP.aclose()
+
+
 def main():
     """Start the bot."""
     logger.info("Starting the bot")
     try:
-        # Create custom request object with increased timeout
+        # Create custom request object with increased timeout; HTTP/2 multiplexes
+        # bursts of replies over one connection instead of queuing for sockets
         request = HTTPXRequest(
-            connection_pool_size=8,
+            connection_pool_size=32,
+            http_version='2',
             read_timeout=30,
             write_timeout=30,
-            connect_timeout=30,
+            connect_timeout=10,
+            pool_timeout=5,
         )
 
         # Create the Application with custom request
-        application = Application.builder().token(TELEGRAM_BOT_TOKEN).request(request).build()
+        application = (
+            Application.builder()
+            .token(TELEGRAM_BOT_TOKEN)
+            .request(request)
+            .post_init(load_saved_advisors)
+            .post_shutdown(close_http_client)
+            .build()
+        )
 
         # Add handlers
         application.add_handler(CommandHandler("start", start))
         application.add_handler(CommandHandler("help", help_command))
-        application.add_handler(CallbackQueryHandler(list_advisors, pattern='^list_advisors$'))
-        application.add_handler(CallbackQueryHandler(search_field, pattern='^search_field$'))
-        application.add_handler(CallbackQueryHandler(help_command, pattern='^help$'))
-        application.add_handler(CallbackQueryHandler(show_schedule, pattern='^s_.*$'))
-        application.add_handler(CallbackQueryHandler(show_advisors_by_field, pattern='^f_.*$'))
-        application.add_handler(CallbackQueryHandler(back_to_main, pattern='^back_to_main$'))
+        application.add_handler(CommandHandler("cache_clear", clear_cache))
+        application.add_handler(CallbackQueryHandler(dispatch_callback))
         application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_search))
 
         logger.info("Handlers registered successfully")
 
+        # Keep the advisors snapshot warm so handlers don't hit Supabase per click
+        if application.job_queue:
+            application.job_queue.run_repeating(refresh_advisors, interval=ADVISOR_REFRESH_INTERVAL, first=0)
+        else:
+            logger.warning("JobQueue is not available, advisors will be fetched on demand")
+
         # Start the bot with drop_pending_updates=True to avoid duplicate messages
         logger.info("Starting polling...")
         application.run_polling(
@@ -0,0 +1,69 @@
+/*
+  # Keep advisor calendars sorted
+
+  1. Changes
+    - Adds `sort_advisor_calendar(jsonb)` that returns the calendar with
+      each month's `available_days` sorted and de-duplicated
+    - Adds a trigger that applies it whenever a calendar is inserted or updated
+    - Sorts calendars of existing advisors
+
+  2. Notes
+    - `busy_slots` keys need no work: jsonb stores object keys ordered by
+      length and then bytewise, which is chronological for 'YYYY-MM-DD' dates
+    - The bot relies on this order and no longer sorts calendars itself
+*/
+
+CREATE OR REPLACE FUNCTION sort_advisor_calendar(calendar jsonb)
+RETURNS jsonb
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT COALESCE(
+    jsonb_object_agg(
+      month.key,
+      CASE
+        WHEN jsonb_typeof(month.value->'available_days') = 'array' THEN
+          jsonb_set(
+            month.value,
+            '{available_days}',
+            COALESCE(
+              (
+                SELECT jsonb_agg(day ORDER BY day)
+                FROM (
+                  SELECT DISTINCT value::int AS day
+                  FROM jsonb_array_elements_text(month.value->'available_days')
+                ) AS days
+              ),
+              '[]'::jsonb
+            )
+          )
+        ELSE month.value
+      END
+    ),
+    '{}'::jsonb
+  )
+  FROM jsonb_each(calendar) AS month;
+$$;
+
+CREATE OR REPLACE FUNCTION sort_advisor_calendar_on_write()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF jsonb_typeof(NEW.calendar) = 'object' THEN
+    NEW.calendar := sort_advisor_calendar(NEW.calendar);
+  END IF;
+  RETURN NEW;
+END $$;
+
+DROP TRIGGER IF EXISTS sort_advisor_calendar ON scientific_advisors;
+
+CREATE TRIGGER sort_advisor_calendar
+  BEFORE INSERT OR UPDATE OF calendar ON scientific_advisors
+  FOR EACH ROW
+  EXECUTE FUNCTION sort_advisor_calendar_on_write();
+
+-- Sort calendars that are already stored
+UPDATE scientific_advisors
+SET calendar = sort_advisor_calendar(calendar)
+WHERE jsonb_typeof(calendar) = 'object';